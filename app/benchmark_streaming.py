@@ -4,22 +4,194 @@ Provides Server-Sent Events endpoints for real-time benchmark progress
 """
 
 import asyncio
+import csv
 import json
+import logging
+import orjson
+import os
+import re
+import sys
+import time
 import uuid
+from collections import OrderedDict, deque, namedtuple
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import AsyncGenerator, Dict, List
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sse_starlette.sse import EventSourceResponse, ServerSentEvent
 from log import logger
 
-# Shared state for active benchmarks
-active_benchmarks: Dict[str, Dict] = {}
+__all__ = ["router"]
+
+# Eigener Child-Logger für Subprozess-Chatter: lässt sich per Logging-Config
+# mit einer Zeile stummschalten, ohne die State-Transition-Logs zu verlieren
+_sub_log = logger.getChild("subprocess")
+
+# Benchmark-Skript einmal beim Import auflösen statt pro /start:
+# Docker-Mount unter /benchmark, sonst Fallback für lokale Entwicklung
+if os.path.exists("/benchmark/benchmark.py"):
+    _BENCH_SCRIPT = "/benchmark/benchmark.py"
+else:
+    _BENCH_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmark", "benchmark.py")
+_PY = sys.executable
+logger.info("✅ Benchmark script resolved to %s", _BENCH_SCRIPT)
+if not os.path.exists(_BENCH_SCRIPT):
+    logger.warning("⚠️  Benchmark script not found at %s - /benchmark/start will fail", _BENCH_SCRIPT)
+
+# Shared state for active benchmarks.
+# OrderedDict in Insert-Reihenfolge: älteste abgeschlossene Einträge werden
+# verdrängt, damit der Speicher über viele Runs hinweg beschränkt bleibt.
+active_benchmarks: "OrderedDict[str, Dict]" = OrderedDict()
+
+# Eviction-Policy: maximal so viele States behalten, abgeschlossene nach TTL räumen
+MAX_ACTIVE_BENCHMARKS = int(os.getenv("BENCH_MAX_ACTIVE", "64"))
+BENCH_TTL_SECS = int(os.getenv("BENCH_TTL_SECS", "1800"))
+
+_janitor_task = None
+
+# Exklusionslock: Benchmarks laufen strikt nacheinander, damit sich
+# konkurrierende Subprozesse nicht gegenseitig die Messwerte verfälschen
+_BENCH_RUN_LOCK = asyncio.Semaphore(1)
+
+# Pub/Sub: run_benchmark ist der einzige Publisher, jeder SSE-Client bekommt
+# eine eigene bounded Queue. Ein langsamer Client blockiert so weder den
+# Publisher noch andere Subscriber.
+subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+# Queue-Kapazität pro Subscriber und Replay-Fenster für Spätverbinder
+SUBSCRIBER_QUEUE_SIZE = 64
+REPLAY_WINDOW = 16
+
+# Sentinel: signalisiert einem Subscriber, dass er wegen Lag getrennt wurde
+_CLOSE = object()
+
+# Progress-Marker direkt auf den rohen Bytes matchen - decode() nur bei Treffer.
+# Format: [PROGRESS] phase|current_run|total_runs|sub_progress|message
+_PROGRESS_RE = re.compile(rb"^\[PROGRESS\]\s+([^|]+)\|(\d+)\|(\d+)\|([-\d.]+)\|(.*)$")
+_LEGACY_RUN_MARKER = "🔄 Run ".encode("utf-8")
+
+# Kompakte Result-Zeile statt 13-Key-Dict pro CSV-Row (spart RAM bei großen Runs)
+ResultRow = namedtuple("ResultRow", [
+    "api_name", "api_category", "run_number", "num_chunks",
+    "embed_ms", "pg_write_ms", "chroma_write_ms",
+    "pg_query_ms", "chroma_query_ms",
+    "pg_result_count", "chroma_result_count",
+    "db_size_pg_mb", "db_size_chroma_mb"
+])
+
+
+def _count_result_rows(path: str) -> int:
+    """Zählt Datenzeilen im Result-CSV (ohne Header)"""
+    with open(path, 'r', newline='') as f:
+        return max(0, sum(1 for _ in f) - 1)
+
+
+def _iter_result_rows(path: str):
+    """
+    Stream the benchmark result CSV as ResultRow tuples.
+
+    Generator statt Liste: die Rows werden nur beim Streamen einer
+    /status?results=true-Response materialisiert, nie komplett im RAM gehalten.
+    """
+    with open(path, 'r', newline='') as f:
+        # csv.reader + vorberechnete Spaltenindizes statt DictReader:
+        # kein frisches Dict + Key-Hashing pro Zeile
+        reader = csv.reader(f)
+        header = next(reader)
+        idx = {name: i for i, name in enumerate(header)}
+        i_api_name = idx['api_name']
+        i_api_category = idx['api_category']
+        i_run_number = idx['run_number']
+        i_num_chunks = idx['num_chunks']
+        i_embed_ms = idx['embed_ms']
+        i_pg_write_ms = idx['pg_write_ms']
+        i_chroma_write_ms = idx['chroma_write_ms']
+        i_pg_query_ms = idx['pg_query_ms']
+        i_chroma_query_ms = idx['chroma_query_ms']
+        i_pg_num_results = idx['pg_num_results']  # CSV uses pg_num_results
+        i_chroma_num_results = idx['chroma_num_results']  # CSV uses chroma_num_results
+        i_db_size_pg_mb = idx['db_size_pg_mb']
+        i_db_size_chroma_mb = idx['db_size_chroma_mb']
+
+        for row in reader:
+            yield ResultRow(
+                api_name=row[i_api_name],
+                api_category=row[i_api_category],
+                run_number=int(row[i_run_number]),
+                num_chunks=int(row[i_num_chunks]),
+                embed_ms=float(row[i_embed_ms]),
+                pg_write_ms=float(row[i_pg_write_ms]),
+                chroma_write_ms=float(row[i_chroma_write_ms]),
+                pg_query_ms=float(row[i_pg_query_ms]),
+                chroma_query_ms=float(row[i_chroma_query_ms]),
+                pg_result_count=int(row[i_pg_num_results]),
+                chroma_result_count=int(row[i_chroma_num_results]),
+                db_size_pg_mb=float(row[i_db_size_pg_mb]),
+                db_size_chroma_mb=float(row[i_db_size_chroma_mb])
+            )
+
+
+def _build_event(benchmark_id: str, state: Dict) -> Dict:
+    """Build the SSE event payload from the current benchmark state"""
+    return {
+        "benchmark_id": benchmark_id,
+        "status": state["status"],
+        "progress": state.get("current_progress", 0),
+        "total": state.get("total_runs", 0),
+        "sub_progress": state.get("sub_progress", 0.0),
+        "overall_progress_pct": state.get("overall_progress_pct", 0),
+        "phase": state.get("phase", ""),
+        "last_message": state.get("last_message", ""),
+        # Raw datetime: orjson serialisiert das nativ, isoformat() entfällt
+        "timestamp": datetime.utcnow()
+    }
+
+def _evict_benchmark(benchmark_id: str):
+    """Remove a benchmark state and its subscriber list"""
+    active_benchmarks.pop(benchmark_id, None)
+    subscribers.pop(benchmark_id, None)
+    logger.info(f"🧹 Evicted benchmark state {benchmark_id}")
+
+
+async def _janitor():
+    """
+    Background sweep: räumt abgeschlossene/fehlgeschlagene Benchmarks, die
+    älter als BENCH_TTL_SECS sind und an denen kein SSE-Stream mehr hängt.
+    """
+    while True:
+        await asyncio.sleep(60)
+        now = time.monotonic()
+        for benchmark_id, state in list(active_benchmarks.items()):
+            if state["status"] not in ("completed", "failed"):
+                continue
+            if subscribers.get(benchmark_id):
+                continue  # noch Clients verbunden
+            finished = state.get("_finished_monotonic")
+            if finished is None:
+                # Erstes Mal gesehen: Stempel setzen, beim nächsten Sweep prüfen
+                state["_finished_monotonic"] = now
+            elif now - finished > BENCH_TTL_SECS:
+                _evict_benchmark(benchmark_id)
+
 
 router = APIRouter(prefix="/benchmark", tags=["benchmark-streaming"])
 
 
+@lru_cache(maxsize=4)
+def _load_specs(specs_file: str, mtime: float) -> dict:
+    """
+    Parse the API specs file, cached per (path, mtime).
+
+    mtime ist Teil des Cache-Keys: ändert sich die Datei, wird neu geparst,
+    sonst entfällt das wiederholte json.load auf jedem POST /start.
+    """
+    with open(specs_file, 'r') as f:
+        return json.load(f)
+
+
 def count_apis_in_categories(categories: List[str]) -> int:
     """
     Count total number of APIs across specified categories
@@ -37,8 +209,7 @@ def count_apis_in_categories(categories: List[str]) -> int:
         return 0
 
     try:
-        with open(specs_file, 'r') as f:
-            specs_data = json.load(f)
+        specs_data = _load_specs(str(specs_file), specs_file.stat().st_mtime)
 
         total_apis = 0
         for category in categories:
@@ -81,20 +252,38 @@ async def start_benchmark(request: BenchmarkStartRequest):
     logger.info(f"🚀 Starting benchmark {benchmark_id}: {request.runs} runs, categories: {request.categories}")
 
     # Calculate total expected runs: runs_per_spec × number_of_apis
-    api_count = count_apis_in_categories(request.categories)
+    # to_thread: stat + (bei Cache-Miss) JSON-Parse blockieren den Event-Loop nicht
+    api_count = await asyncio.to_thread(count_apis_in_categories, request.categories)
     total_runs = request.runs * api_count
     logger.info(f"📊 Total expected runs: {request.runs} runs/API × {api_count} APIs = {total_runs} total runs")
 
     # Initialize benchmark state
+    # "recent_events" ist das Replay-Fenster für neu verbindende SSE-Clients
+    # Status startet als "queued"; run_benchmark setzt "running", sobald der
+    # Exklusionslock gehalten wird
     active_benchmarks[benchmark_id] = {
-        "status": "running",
+        "status": "queued",
         "runs": request.runs,
         "categories": request.categories,
         "started_at": datetime.utcnow().isoformat(),
-        "results": [],
         "current_progress": 0,
-        "total_runs": total_runs
+        "total_runs": total_runs,
+        "recent_events": deque(maxlen=REPLAY_WINDOW)
     }
+    subscribers[benchmark_id] = []
+
+    # LRU-Kappung: älteste nicht mehr laufende Einträge verdrängen
+    if len(active_benchmarks) > MAX_ACTIVE_BENCHMARKS:
+        for old_id, old_state in list(active_benchmarks.items()):
+            if len(active_benchmarks) <= MAX_ACTIVE_BENCHMARKS:
+                break
+            if old_id != benchmark_id and old_state["status"] not in ("running", "queued"):
+                _evict_benchmark(old_id)
+
+    # TTL-Sweep lazy starten (braucht einen laufenden Event-Loop)
+    global _janitor_task
+    if _janitor_task is None:
+        _janitor_task = asyncio.create_task(_janitor())
 
     # Start benchmark in background
     asyncio.create_task(run_benchmark(benchmark_id, request.runs, request.categories))
@@ -111,103 +300,131 @@ async def run_benchmark(benchmark_id: str, runs: int, categories: List[str]):
     Background task that runs the actual benchmark
     Simulates benchmark execution and updates state
     """
-    import sys
-    import subprocess
-    import csv
-
     benchmark_state = active_benchmarks[benchmark_id]
     logger.info(f"📊 Benchmark {benchmark_id} background task started")
 
-    try:
-        # Build command - use path that works in Docker
-        import os
-        # Check if running in Docker (benchmark mounted at /benchmark)
-        if os.path.exists("/benchmark/benchmark.py"):
-            benchmark_script = "/benchmark/benchmark.py"
-            logger.info(f"✅ Using Docker benchmark script: {benchmark_script}")
-        else:
-            # Fallback for local development
-            benchmark_script = os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmark", "benchmark.py")
-            logger.info(f"✅ Using local benchmark script: {benchmark_script}")
+    def publish_event():
+        """Fan-out the current state to all subscriber queues (non-blocking)"""
+        event = _build_event(benchmark_id, benchmark_state)
+        # Einmal serialisieren, alle Subscriber teilen sich den fertigen
+        # JSON-String - statt N-mal pro Event zu encodieren
+        item = (event["status"], orjson.dumps(event).decode())
+        benchmark_state["recent_events"].append(item)
+        for q in list(subscribers.get(benchmark_id, [])):
+            try:
+                q.put_nowait(item)
+            except asyncio.QueueFull:
+                # Subscriber kommt nicht hinterher: trennen statt blockieren
+                subscribers[benchmark_id].remove(q)
+                try:
+                    q.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+                q.put_nowait(_CLOSE)
 
+    try:
         output_file = f"/tmp/benchmark_{benchmark_id}.csv"
 
         cmd = [
-            sys.executable,
+            _PY,
             "-u",  # Unbuffered stdout/stderr - WICHTIG für Echtzeit-Progress!
-            benchmark_script,
+            _BENCH_SCRIPT,
             "--runs", str(runs),
             "--categories", *categories,
             "--output", output_file
         ]
 
-        logger.info(f"🔧 Command: {' '.join(cmd)}")
-
-        # Run benchmark process
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-
-        logger.info(f"⚙️  Subprocess started, PID: {process.pid}")
-
-        # Collect stderr for error logging
-        stderr_lines = []
-
-        # Stream output and update progress
-        async for line in process.stdout:
-            line_str = line.decode().strip()
-            logger.info(f"📝 [stdout] {line_str}")
-
-            # Parse structured progress markers
-            # Format: [PROGRESS] phase|current_run|total_runs|sub_progress|message
-            if line_str.startswith("[PROGRESS]"):
-                try:
-                    # Parse: "[PROGRESS] phase|current_run|total_runs|sub_progress|message"
-                    parts = line_str[10:].strip().split("|", 4)  # Skip "[PROGRESS]"
-                    if len(parts) == 5:
-                        phase, current_run_str, total_runs_str, sub_progress_str, message = parts
-                        current_run = int(current_run_str)
-                        total_runs_int = int(total_runs_str)
-                        sub_progress = float(sub_progress_str)
-
-                        # Calculate overall progress: (completed_runs + sub_progress_of_current) / total_runs
-                        # completed_runs = current_run - 1 (da current_run noch läuft)
-                        # overall_progress = (current_run - 1 + sub_progress) / total_runs
-                        if total_runs_int > 0:
-                            overall_progress_pct = ((current_run - 1 + sub_progress) / total_runs_int) * 100
-                        else:
-                            overall_progress_pct = 0
-
-                        # Update state
-                        benchmark_state["current_progress"] = current_run
-                        benchmark_state["sub_progress"] = sub_progress
-                        benchmark_state["overall_progress_pct"] = round(overall_progress_pct, 1)
-                        benchmark_state["phase"] = phase
+        # %-Formatierung: der join passiert nur, wenn der Handler wirklich loggt
+        logger.info("🔧 Command: %s", cmd)
+
+        # Nur ein Benchmark zur Zeit: parallel laufende Subprozesse teilen
+        # sich CPU/IO und dieselben Backends, die gemessenen Zeiten wären
+        # damit wertlos. Weitere /start-Requests warten in der Queue.
+        async with _BENCH_RUN_LOCK:
+            benchmark_state["status"] = "running"
+            publish_event()
+
+            # Run benchmark process
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+
+            logger.info(f"⚙️  Subprocess started, PID: {process.pid}")
+
+            # Collect stderr for error logging (bounded, damit ein gesprächiger
+            # Subprozess den Webserver nicht per RAM flutet)
+            stderr_lines = deque(maxlen=500)
+
+            # Stream output and update progress
+            async def pump_stdout():
+                async for line in process.stdout:
+                    raw = line.rstrip()
+                    # DEBUG statt INFO: Formatierung jeder stdout-Zeile ist
+                    # auf dem Event-Loop messbarer Overhead bei hohem Durchsatz
+                    if _sub_log.isEnabledFor(logging.DEBUG):
+                        _sub_log.debug("[stdout] %s", raw.decode(errors='replace'))
+
+                    # Parse structured progress markers on the raw bytes -
+                    # decode() erst bei tatsächlichem Treffer
+                    m = _PROGRESS_RE.match(raw)
+                    if m:
+                        try:
+                            phase = m.group(1).decode()
+                            current_run = int(m.group(2))
+                            total_runs_int = int(m.group(3))
+                            sub_progress = float(m.group(4))
+                            message = m.group(5).decode(errors='replace')
+
+                            # Calculate overall progress: (completed_runs + sub_progress_of_current) / total_runs
+                            # completed_runs = current_run - 1 (da current_run noch läuft)
+                            # overall_progress = (current_run - 1 + sub_progress) / total_runs
+                            if total_runs_int > 0:
+                                overall_progress_pct = ((current_run - 1 + sub_progress) / total_runs_int) * 100
+                            else:
+                                overall_progress_pct = 0
+
+                            # Update state
+                            benchmark_state["current_progress"] = current_run
+                            benchmark_state["sub_progress"] = sub_progress
+                            benchmark_state["overall_progress_pct"] = round(overall_progress_pct, 1)
+                            benchmark_state["phase"] = phase
+                            benchmark_state["last_update"] = datetime.utcnow().isoformat()
+                            benchmark_state["last_message"] = message
+
+                            publish_event()
+
+                            logger.info("✅ Progress: %d/%d (%.1f%%) - %s - %s",
+                                        current_run, total_runs_int, overall_progress_pct, phase, message)
+                        except Exception as e:
+                            logger.warning("⚠️  Failed to parse progress marker: %r - Error: %s", raw, e)
+
+                    # Fallback: Legacy marker for backward compatibility
+                    elif _LEGACY_RUN_MARKER in raw:
+                        benchmark_state["current_progress"] += 1
                         benchmark_state["last_update"] = datetime.utcnow().isoformat()
-                        benchmark_state["last_message"] = message
+                        benchmark_state["last_message"] = raw.decode(errors='replace').strip()
+                        publish_event()
+                        logger.info("✅ Legacy progress updated: %d/%d",
+                                    benchmark_state['current_progress'], benchmark_state.get('total_runs', 0))
 
-                        logger.info(f"✅ Progress: {current_run}/{total_runs_int} ({overall_progress_pct:.1f}%) - {phase} - {message}")
-                except Exception as e:
-                    logger.warning(f"⚠️  Failed to parse progress marker: {line_str} - Error: {e}")
+            async def pump_stderr():
+                async for line in process.stderr:
+                    text = line.decode(errors='replace').rstrip()
+                    stderr_lines.append(text)
+                    _sub_log.debug("[stderr] %s", text)
 
-            # Fallback: Legacy marker for backward compatibility
-            elif "🔄 Run " in line_str:
-                benchmark_state["current_progress"] += 1
-                benchmark_state["last_update"] = datetime.utcnow().isoformat()
-                benchmark_state["last_message"] = line_str
-                logger.info(f"✅ Legacy progress updated: {benchmark_state['current_progress']}/{benchmark_state.get('total_runs', 0)}")
+            # Beide Pipes parallel leeren: läuft nur stdout, blockiert der
+            # Subprozess, sobald sein stderr-Pipe-Buffer (~64 KiB) voll ist,
+            # und der Parent wartet ewig auf weitere stdout-Zeilen (Deadlock)
+            await asyncio.gather(pump_stdout(), pump_stderr())
 
-        # Wait for completion and capture stderr
-        await process.wait()
+            # Wait for completion
+            await process.wait()
 
-        # Read stderr
-        stderr_data = await process.stderr.read()
-        if stderr_data:
-            stderr_text = stderr_data.decode().strip()
-            logger.error(f"❌ [stderr] {stderr_text}")
-            stderr_lines.append(stderr_text)
+        if stderr_lines:
+            logger.error(f"❌ [stderr] {' '.join(stderr_lines)[:2000]}")
 
         exit_code = process.returncode
         logger.info(f"🏁 Process finished with exit code: {exit_code}")
@@ -219,52 +436,41 @@ async def run_benchmark(benchmark_id: str, runs: int, categories: List[str]):
             logger.error(f"❌ {error_msg}")
             benchmark_state["status"] = "failed"
             benchmark_state["error"] = error_msg
+            publish_event()
             return
 
         # Load results from CSV
         logger.info(f"📂 Looking for results at: {output_file}")
         if os.path.exists(output_file):
-            logger.info(f"✅ Results file found, loading...")
-            with open(output_file, 'r') as f:
-                reader = csv.DictReader(f)
-                results = []
-                for row in reader:
-                    results.append({
-                        'api_name': row['api_name'],
-                        'api_category': row['api_category'],
-                        'run_number': int(row['run_number']),
-                        'num_chunks': int(row['num_chunks']),
-                        'embed_ms': float(row['embed_ms']),
-                        'pg_write_ms': float(row['pg_write_ms']),
-                        'chroma_write_ms': float(row['chroma_write_ms']),
-                        'pg_query_ms': float(row['pg_query_ms']),
-                        'chroma_query_ms': float(row['chroma_query_ms']),
-                        'pg_result_count': int(row['pg_num_results']),  # CSV uses pg_num_results
-                        'chroma_result_count': int(row['chroma_num_results']),  # CSV uses chroma_num_results
-                        'db_size_pg_mb': float(row['db_size_pg_mb']),
-                        'db_size_chroma_mb': float(row['db_size_chroma_mb'])
-                    })
-                benchmark_state["results"] = results
-                logger.info(f"✅ Loaded {len(results)} result rows")
+            # Results bleiben im CSV (Source of Truth) und werden von /status
+            # bei Bedarf gestreamt, statt dauerhaft im Prozess-RAM zu liegen.
+            # to_thread: File-IO würde sonst den Event-Loop blockieren.
+            row_count = await asyncio.to_thread(_count_result_rows, output_file)
+            benchmark_state["results_path"] = output_file
+            benchmark_state["row_count"] = row_count
+            logger.info(f"✅ Results file ready with {row_count} rows")
         else:
             logger.error(f"❌ Results file not found at {output_file}")
             benchmark_state["status"] = "failed"
             benchmark_state["error"] = f"Results file not found: {output_file}"
+            publish_event()
             return
 
         # Mark as completed
         benchmark_state["status"] = "completed"
         benchmark_state["completed_at"] = datetime.utcnow().isoformat()
+        publish_event()
         logger.info(f"✅ Benchmark {benchmark_id} completed successfully")
 
     except Exception as e:
         logger.exception(f"❌ Benchmark {benchmark_id} failed with exception:")
         benchmark_state["status"] = "failed"
         benchmark_state["error"] = str(e)
+        publish_event()
 
 
 @router.get("/stream/{benchmark_id}")
-async def stream_benchmark(benchmark_id: str):
+async def stream_benchmark(benchmark_id: str, request: Request):
     """
     SSE endpoint that streams benchmark progress in real-time
 
@@ -275,85 +481,91 @@ async def stream_benchmark(benchmark_id: str):
         logger.warning(f"⚠️  Benchmark {benchmark_id} not found")
         raise HTTPException(status_code=404, detail="Benchmark not found")
 
-    async def event_generator() -> AsyncGenerator[str, None]:
-        """Generator that yields SSE events"""
-        last_progress = -1
-        last_sub_progress = -1.0
-        last_message = ""
-        first_event = True
-
-        while True:
-            benchmark_state = active_benchmarks.get(benchmark_id)
-
-            if not benchmark_state:
-                break
-
-            # Send update if progress or sub-progress changed
-            current_progress = benchmark_state.get("current_progress", 0)
-            current_sub_progress = benchmark_state.get("sub_progress", 0.0)
-            current_message = benchmark_state.get("last_message", "")
-
-            # WICHTIG: Sende sofort den aktuellen State beim ersten Connect (auch wenn 0)
-            # oder wenn sich Progress, Sub-Progress oder Message geändert hat
-            if (first_event or
-                current_progress != last_progress or
-                current_sub_progress != last_sub_progress or
-                current_message != last_message):
-
-                first_event = False
-
-                data = {
-                    "benchmark_id": benchmark_id,
-                    "status": benchmark_state["status"],
-                    "progress": current_progress,
-                    "total": benchmark_state.get("total_runs", 0),
-                    "sub_progress": current_sub_progress,
-                    "overall_progress_pct": benchmark_state.get("overall_progress_pct", 0),
-                    "phase": benchmark_state.get("phase", ""),
-                    "last_message": current_message,
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-
-                yield f"data: {json.dumps(data)}\n\n"
-                last_progress = current_progress
-                last_sub_progress = current_sub_progress
-                last_message = current_message
-
-            # Check if completed
-            if benchmark_state["status"] in ["completed", "failed"]:
-                # Send final event WITHOUT results (results are fetched via /status endpoint)
-                # This prevents SSE messages from becoming too large with big APIs
-                final_data = {
-                    'benchmark_id': benchmark_id,
-                    'status': benchmark_state['status'],
-                    'progress': benchmark_state.get('current_progress', 0),
-                    'total': benchmark_state.get('total_runs', 0),
-                    'last_message': 'Benchmark finished',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'message': 'Benchmark finished'
-                    # results NOT included - client should fetch via GET /status/{benchmark_id}
-                }
-                yield f"data: {json.dumps(final_data)}\n\n"
-                break
-
-            # Wait before next check
-            await asyncio.sleep(0.5)
-
-    return StreamingResponse(
+    async def event_generator() -> AsyncGenerator[dict, None]:
+        """Generator that yields SSE events from a bounded subscriber queue"""
+        benchmark_state = active_benchmarks[benchmark_id]
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        subs = subscribers.setdefault(benchmark_id, [])
+
+        # Replay-Fenster: Spätverbinder bekommen die letzten Events als Kontext
+        recent = list(benchmark_state["recent_events"])
+        for item in recent:
+            queue.put_nowait(item)
+        subs.append(queue)
+
+        try:
+            if not recent:
+                # WICHTIG: Sende sofort den aktuellen State beim ersten Connect (auch wenn 0)
+                snapshot = _build_event(benchmark_id, benchmark_state)
+                yield {"data": orjson.dumps(snapshot).decode()}
+                if snapshot["status"] in ("completed", "failed"):
+                    return
+
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=5.0)
+                except asyncio.TimeoutError:
+                    # Kein Event: prüfen, ob der Client überhaupt noch dran ist,
+                    # statt bis zum nächsten yield auf den Broken-Pipe zu warten
+                    if await request.is_disconnected():
+                        logger.info("📡 SSE client disconnected from benchmark %s", benchmark_id)
+                        break
+                    continue
+                if item is _CLOSE:
+                    logger.warning(f"⚠️  Dropping lagging SSE subscriber for benchmark {benchmark_id}")
+                    break
+
+                status, payload = item
+                # Events enthalten keine results (zu groß für SSE) -
+                # Clients holen sie via GET /status/{benchmark_id}
+                yield {"data": payload}
+
+                if status in ("completed", "failed"):
+                    break
+        finally:
+            if queue in subs:
+                subs.remove(queue)
+
+    # EventSourceResponse setzt Cache-Control/X-Accel-Buffering selbst und
+    # sendet alle 5s einen ": heartbeat"-Kommentar, damit Proxies die
+    # Verbindung bei langen Embedding-Phasen nicht als idle schließen
+    return EventSourceResponse(
         event_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no"  # Disable nginx buffering
-        }
+        ping=5,
+        ping_message_factory=lambda: ServerSentEvent(comment="heartbeat")
     )
 
 
 @router.get("/status/{benchmark_id}")
-async def get_benchmark_status(benchmark_id: str):
-    """Get current status of a benchmark"""
+async def get_benchmark_status(benchmark_id: str, results: bool = False):
+    """
+    Get current status of a benchmark
+
+    Default: nur Metadaten. Mit ?results=true werden die Result-Rows direkt
+    aus dem CSV gestreamt statt sie im Server-RAM vorzuhalten.
+    """
     if benchmark_id not in active_benchmarks:
         raise HTTPException(status_code=404, detail="Benchmark not found")
 
-    return active_benchmarks[benchmark_id]
+    # "recent_events" und "_"-Keys sind interner State, gehören nicht in die Response
+    state = active_benchmarks[benchmark_id]
+    meta = {k: v for k, v in state.items()
+            if k != "recent_events" and not k.startswith("_")}
+
+    results_path = state.get("results_path")
+    if not results or not results_path:
+        return meta
+
+    def gen():
+        # Sync-Generator: Starlette iteriert ihn im Threadpool, File-IO
+        # bleibt damit vom Event-Loop weg
+        yield b'{"meta":' + orjson.dumps(meta) + b',"results":['
+        first = True
+        for row in _iter_result_rows(results_path):
+            if not first:
+                yield b','
+            first = False
+            yield orjson.dumps(row._asdict())
+        yield b']}'
+
+    return StreamingResponse(gen(), media_type="application/json")
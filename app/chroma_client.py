@@ -1,6 +1,9 @@
 # chroma_client.py
 from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import os
+import time
 import chromadb  # kommt aus chromadb-client (Public API)
 from chromadb.config import Settings
 
@@ -9,6 +12,26 @@ _collection = None
 
 COLLECTION_NAME = os.getenv("CHROMA_COLLECTION", "api_specs")
 
+# Upserts in Micro-Batches statt einem einzigen Riesen-Request: begrenzt die
+# Peak-Größe des serialisierten Bodys und überlappt Encode/Send mit dem
+# Index-Write auf dem Server
+UPSERT_BATCH = int(os.getenv("CHROMA_UPSERT_BATCH", "250"))
+
+# Der Chroma-HTTP-Client ist threadsafe und die Route ist I/O-bound:
+# mehrere Batches gleichzeitig rausschicken überlappt Serialisierung,
+# Netzwerk und serverseitigen HNSW-Insert
+UPSERT_WORKERS = int(os.getenv("CHROMA_UPSERT_WORKERS", "4"))
+
+# EMBED_DTYPE=fp16 quantisiert Embeddings vor dem Transport auf halbe
+# Präzision — Gegenstück zur halfvec-Spalte auf der pgvector-Seite,
+# damit beide Backends mit derselben Präzision arbeiten
+_FP16 = os.getenv("EMBED_DTYPE", "fp32") == "fp16"
+
+def _quantize(embeddings):
+    if not _FP16:
+        return embeddings
+    return np.asarray(embeddings, dtype=np.float16)
+
 def init_chroma(host: str = "chroma", port: int = 8000):
     global _client, _collection
 
@@ -16,25 +39,66 @@ def init_chroma(host: str = "chroma", port: int = 8000):
     settings = Settings(anonymized_telemetry=False)
     _client = chromadb.HttpClient(host=host, port=port, settings=settings)
 
+    # Connection-Pool direkt aufwärmen, damit der erste Upsert nicht den
+    # Handshake bezahlt
+    _client.heartbeat()
+
     # get_or_create_collection ist gleich geblieben in v2-Client
     _collection = _client.get_or_create_collection(
         name=COLLECTION_NAME,
         metadata={"description": "OpenAPI specs for RAG benchmarking"},
     )
 
-def upsert_source(source: str, chunks: List[str], embeddings: List[List[float]]):
+def upsert_source(source: str, chunks: List[str], embeddings: np.ndarray):
     assert _collection is not None
-    ids = [f"{source}::{i}" for i in range(len(chunks))]
-    metadatas = [{"source": source, "chunk": i} for i in range(len(chunks))]
-    _collection.upsert(
-        ids=ids,
-        documents=chunks,
-        embeddings=embeddings,
-        metadatas=metadatas,
-    )
+    # Fail fast statt tief im HTTP-Client
+    assert len(chunks) == len(embeddings), f"chunks ({len(chunks)}) != embeddings ({len(embeddings)})"
+    embeddings = _quantize(embeddings)
+    # Ein Durchlauf mit vorallokierten Listen statt zwei getrennter Comprehensions
+    n = len(chunks)
+    ids = [None] * n
+    metadatas = [None] * n
+    for i in range(n):
+        ids[i] = f"{source}::{i}"
+        metadatas[i] = {"source": source, "chunk": i}
+    def _upsert_slice(start: int):
+        end = min(start + UPSERT_BATCH, n)
+        _collection.upsert(
+            ids=ids[start:end],
+            documents=chunks[start:end],
+            embeddings=embeddings[start:end],
+            metadatas=metadatas[start:end],
+        )
+
+    starts = range(0, n, UPSERT_BATCH)
+    if len(starts) <= 1:
+        for start in starts:
+            _upsert_slice(start)
+    else:
+        with ThreadPoolExecutor(max_workers=UPSERT_WORKERS) as pool:
+            # list() erzwingt das Einsammeln, damit Exceptions propagieren
+            list(pool.map(_upsert_slice, starts))
+    _invalidate_count_cache()
+    _invalidate_dir_size_cache()
+
+def upsert_batch(source: str, start: int, chunks: List[str], embeddings: np.ndarray):
+    """
+    Upsert eines Teilbatches mit Chunk-Offset. Gegenstück zu
+    db_pg.append_chunks für den gestreamten Ingest-Pfad.
+    """
+    assert _collection is not None
+    assert len(chunks) == len(embeddings), f"chunks ({len(chunks)}) != embeddings ({len(embeddings)})"
+    embeddings = _quantize(embeddings)
+    ids = [f"{source}::{start + i}" for i in range(len(chunks))]
+    metadatas = [{"source": source, "chunk": start + i} for i in range(len(chunks))]
+    _collection.upsert(ids=ids, documents=chunks, embeddings=embeddings, metadatas=metadatas)
+    _invalidate_count_cache()
+    _invalidate_dir_size_cache()
 
 def query(embedding: List[float], k: int = 5, where: Optional[dict] = None):
     assert _collection is not None
+    if _FP16:
+        embedding = np.asarray(embedding, dtype=np.float16)
     query_params = {
         "query_embeddings": [embedding],
         "n_results": k,
@@ -43,9 +107,20 @@ def query(embedding: List[float], k: int = 5, where: Optional[dict] = None):
         query_params["where"] = where
     return _collection.query(**query_params)
 
+# Der scandir-Walk ist zwar billig, aber /stats wird vom Benchmark pro Run
+# mehrfach abgefragt; kurzer TTL-Cache pro Pfad spart das erneute Ablaufen.
+# Explizit invalidiert bei Upsert/Reset — innerhalb der TTL darf /stats
+# sonst die Größe von vor dem Write melden
+_DIR_SIZE_CACHE_TTL = 2.0
+_dir_size_cache = {}
+
+def _invalidate_dir_size_cache():
+    _dir_size_cache.clear()
+
 def get_directory_size(path: str) -> float:
     """
     Berechnet die Größe eines Verzeichnisses rekursiv in MB.
+    Ergebnisse werden pro Pfad für kurze Zeit gecacht.
 
     Args:
         path: Pfad zum Verzeichnis
@@ -53,19 +128,36 @@ def get_directory_size(path: str) -> float:
     Returns:
         Größe in MB (float)
     """
+    now = time.monotonic()
+    cached = _dir_size_cache.get(path)
+    if cached is not None and now - cached[1] <= _DIR_SIZE_CACHE_TTL:
+        return cached[0]
+    # os.scandir statt os.walk: Größe und Symlink-Status kommen aus einem
+    # einzigen DirEntry.stat() pro Eintrag statt ~4 stat-Syscalls pro Datei
     total_size = 0
-    try:
-        for dirpath, dirnames, filenames in os.walk(path):
-            for filename in filenames:
-                filepath = os.path.join(dirpath, filename)
-                # Ignoriere Symlinks und nicht-existierende Dateien
-                if os.path.exists(filepath) and not os.path.islink(filepath):
-                    total_size += os.path.getsize(filepath)
-    except Exception as e:
-        print(f"Error calculating ChromaDB directory size: {e}")
-        return 0.0
-
-    return total_size / (1024 * 1024)  # Bytes zu MB
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_symlink():
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            total_size += entry.stat(follow_symlinks=False).st_size
+                    except FileNotFoundError:
+                        # Datei wurde zwischen Listing und stat gelöscht
+                        continue
+        except (PermissionError, FileNotFoundError) as e:
+            print(f"Error calculating ChromaDB directory size: {e}")
+            continue
+
+    size_mb = total_size / (1024 * 1024)  # Bytes zu MB
+    _dir_size_cache[path] = (size_mb, now)
+    return size_mb
 
 def get_filesystem_size() -> float:
     """
@@ -82,51 +174,31 @@ def get_filesystem_size() -> float:
         print(f"Warning: ChromaDB data path not found: {chroma_data_path}")
         return 0.0
 
-def get_collection_size_mb() -> float:
-    """
-    Berechnet die tatsächliche Größe der ChromaDB-Collection basierend auf
-    Anzahl Dokumente und Embedding-Dimensionen.
-
-    Berechnung:
-    - Embeddings: count × 384 dims × 4 bytes (float32) = count × 1,536 bytes
-    - Text-Dokumente: ~1,200 bytes (durchschnittliche Chunk-Größe)
-    - Metadaten (source, chunk_id): ~100 bytes
-    - SQLite Indizes und Overhead: ~30% zusätzlich
-
-    Insgesamt: count × (1,536 + 1,200 + 100) × 1.3 = count × ~3,700 bytes
+# count() ist ein Full-Table-RPC; kurzer TTL-Cache, explizit invalidiert
+# bei Upsert/Reset
+_COUNT_CACHE_TTL = 2.0
+_count_cache = {"value": None, "ts": 0.0}
 
-    Returns:
-        Größe in MB
-    """
+def _cached_count() -> int:
     assert _collection is not None
-    count = _collection.count()
-
-    if count == 0:
-        return 0.0
-
-    # Embedding-Größe: 384 dimensions × 4 bytes (float32)
-    embedding_size_bytes = 384 * 4  # 1,536 bytes
-
-    # Durchschnittliche Text-Größe pro Chunk (CHUNK_SIZE ist 1200 chars)
-    text_size_bytes = 1200  # ~1,200 bytes UTF-8
-
-    # Metadaten (source string, chunk_id int)
-    metadata_size_bytes = 100
+    now = time.monotonic()
+    if _count_cache["value"] is None or now - _count_cache["ts"] > _COUNT_CACHE_TTL:
+        _count_cache["value"] = _collection.count()
+        _count_cache["ts"] = now
+    return _count_cache["value"]
 
-    # Basis-Größe
-    base_size_bytes = count * (embedding_size_bytes + text_size_bytes + metadata_size_bytes)
-
-    # SQLite Indizes und Overhead (~30%)
-    total_size_bytes = base_size_bytes * 1.3
-
-    # Konvertiere zu MB
-    return total_size_bytes / (1024 * 1024)
+def _invalidate_count_cache():
+    _count_cache["value"] = None
 
 def get_stats():
     """Gibt Statistiken über die ChromaDB-Collection zurück"""
     assert _collection is not None
-    count = _collection.count()
-    size_mb = get_collection_size_mb()
+    count = _cached_count()
+
+    # Gemessene On-Disk-Größe statt der früheren Schätzung aus
+    # Magic-Konstanten (384 dims × 4 bytes + Pauschalen), die je nach
+    # Chunk-Längen und EMBED_DIM um Faktor 2 daneben liegen konnte
+    size_mb = get_filesystem_size()
 
     return {
         "document_count": count,
@@ -142,3 +214,5 @@ def reset_collection():
         name=COLLECTION_NAME,
         metadata={"description": "OpenAPI specs for RAG benchmarking"}
     )
+    _invalidate_count_cache()
+    _invalidate_dir_size_cache()
@@ -23,6 +23,10 @@ PG_WAIT_INT     = float(os.getenv("PG_WAIT_INTERVAL_SECONDS", "2"))
 
 # Vector & collections
 EMBED_DIM = int(os.getenv("EMBED_DIM", "768"))
+# Speicher-/Transport-Präzision der Embeddings: "fp32" (Default, volle
+# Präzision für den fairen Vergleich) oder "fp16" (halbvektor/halfvec,
+# halbiert Bytes bei <1% Recall-Verlust auf normalisierten Embeddings)
+EMBED_DTYPE = os.getenv("EMBED_DTYPE", "fp32")
 CHROMA_COLLECTION = os.getenv("CHROMA_COLLECTION", "apispecs")
 
 # Chunking
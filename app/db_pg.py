@@ -1,14 +1,63 @@
+import time
+
+import numpy as np
 import psycopg
 from psycopg.rows import dict_row
-from typing import List, Dict, Any
-from config import EMBED_DIM, PG_HNSW_M, PG_HNSW_EF_CONSTRUCTION, PG_HNSW_EF_SEARCH, PG_HOST, PG_PORT, PG_DB, PG_USER, PG_PASSWORD_FILE
-from utils import read_secret, vector_literal
+from psycopg_pool import ConnectionPool
+from pgvector import HalfVector
+from pgvector.psycopg import register_vector
+from typing import List, Dict, Any, Optional
+from config import EMBED_DIM, EMBED_DTYPE, PG_HNSW_M, PG_HNSW_EF_CONSTRUCTION, PG_HNSW_EF_SEARCH, PG_HOST, PG_PORT, PG_DB, PG_USER, PG_PASSWORD_FILE
+from utils import read_secret
+
+# Optionale FP16-Quantisierung: halfvec halbiert Storage und Wire-Bytes,
+# kostet auf normalisierten Embeddings <1% Recall. Default bleibt fp32
+_FP16 = EMBED_DTYPE == "fp16"
+_VECTOR_TYPE = "halfvec" if _FP16 else "vector"
+_VECTOR_OPS = "halfvec_cosine_ops" if _FP16 else "vector_cosine_ops"
+
+def _pg_vec(vec: List[float]):
+    if _FP16:
+        return HalfVector(vec)
+    return np.asarray(vec, dtype=np.float32)
 
 def _dsn() -> str:
     pw = read_secret(PG_PASSWORD_FILE)
     return f"host={PG_HOST} port={PG_PORT} dbname={PG_DB} user={PG_USER} password={pw}"
 
+# Connection-Pool statt psycopg.connect pro Aufruf: TCP + Auth + Setup
+# kosten zweistellige Millisekunden und dominieren sonst die eigentliche
+# LIMIT-k-Query. prepare_threshold=1 server-prepared die Topk-Query nach
+# dem ersten Durchlauf
+_pool: Optional[ConnectionPool] = None
+
+def _configure_conn(conn):
+    register_vector(conn)
+
+def _get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool(
+            _dsn(),
+            min_size=2,
+            max_size=10,
+            open=True,
+            configure=_configure_conn,
+            kwargs={"autocommit": True, "prepare_threshold": 1},
+        )
+    return _pool
+
+_INDEX_NAME = "idx_documents_embedding_hnsw_cos"
+_CREATE_INDEX_SQL = f"""
+    CREATE INDEX IF NOT EXISTS {_INDEX_NAME}
+    ON documents
+    USING hnsw (embedding {_VECTOR_OPS})
+    WITH (m = {PG_HNSW_M}, ef_construction = {PG_HNSW_EF_CONSTRUCTION});
+"""
+
 def init_pg_schema():
+    # DDL läuft über eine Direktverbindung, weil der Pool-Configure-Hook
+    # (register_vector) die vector-Extension bereits voraussetzt
     with psycopg.connect(_dsn(), autocommit=True) as conn:
         with conn.cursor() as cur:
             cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
@@ -18,53 +67,90 @@ def init_pg_schema():
                     source TEXT,
                     chunk_id INT,
                     content TEXT,
-                    embedding vector({EMBED_DIM})
+                    embedding {_VECTOR_TYPE}({EMBED_DIM})
                 );
             """)
-            cur.execute(f"""
-                DO $$
-                BEGIN
-                    IF NOT EXISTS (
-                        SELECT 1 FROM pg_indexes WHERE indexname = 'idx_documents_embedding_hnsw_l2'
-                    ) THEN
-                        CREATE INDEX idx_documents_embedding_hnsw_l2
-                        ON documents
-                        USING hnsw (embedding vector_l2_ops)
-                        WITH (m = {PG_HNSW_M}, ef_construction = {PG_HNSW_EF_CONSTRUCTION});
-                    END IF;
-                END$$;
-            """)
+            # Migration: alter L2-Index weicht dem Cosine-Index (idempotent)
+            cur.execute("DROP INDEX IF EXISTS idx_documents_embedding_hnsw_l2;")
+            cur.execute(_CREATE_INDEX_SQL)
+    # Pool direkt aufwärmen, damit der erste Request keinen Connect bezahlt
+    _get_pool()
 
-def replace_source(source: str, chunks: List[str], embeddings: List[List[float]]):
-    with psycopg.connect(_dsn(), autocommit=True) as conn:
+def drop_embedding_index():
+    """
+    Entfernt den HNSW-Index vor großen Bulk-Ingests: ohne Index kostet
+    COPY keinen inkrementellen Graph-Update pro Zeile.
+    """
+    with _get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP INDEX IF EXISTS {_INDEX_NAME};")
+
+def create_embedding_index():
+    """Baut den HNSW-Index nach einem Bulk-Ingest einmalig neu auf"""
+    with _get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(_CREATE_INDEX_SQL)
+
+def replace_source(source: str, chunks: List[str], embeddings: np.ndarray):
+    # DELETE + COPY in einer Transaktion: COPY streamt alle Zeilen über einen
+    # einzigen Roundtrip statt N einzelner INSERTs mit je eigenem Parse/Plan.
+    # Vektoren gehen binär raus (register_vector): 4 Bytes pro Float statt
+    # ~13 Zeichen ASCII, und der Server parst keinen Text mehr
+    with _get_pool().connection() as conn:
+        with conn.transaction():
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM documents WHERE source = %s;", (source,))
+                with cur.copy("COPY documents (source, chunk_id, content, embedding) FROM STDIN WITH (FORMAT BINARY)") as cp:
+                    cp.set_types(["text", "int4", "text", _VECTOR_TYPE])
+                    for i, (chunk, vec) in enumerate(zip(chunks, embeddings)):
+                        cp.write_row((source, i, chunk, _pg_vec(vec)))
+    _invalidate_stats_cache()
+
+def delete_source(source: str):
+    """Löscht alle Chunks einer Quelle (Vorbereitung für gestreamte Appends)"""
+    with _get_pool().connection() as conn:
         with conn.cursor() as cur:
             cur.execute("DELETE FROM documents WHERE source = %s;", (source,))
-            for i, (chunk, vec) in enumerate(zip(chunks, embeddings)):
-                cur.execute(
-                    f"INSERT INTO documents (source, chunk_id, content, embedding) VALUES (%s, %s, %s, %s::vector({EMBED_DIM}));",
-                    (source, i, chunk, vector_literal(vec))
-                )
+    _invalidate_stats_cache()
+
+def append_chunks(source: str, start: int, chunks: List[str], embeddings: np.ndarray):
+    """
+    Hängt einen Teilbatch per binärem COPY an. Wird vom gestreamten
+    Ingest-Pfad genutzt: delete_source einmal vorab, dann append pro Batch.
+    """
+    with _get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            with cur.copy("COPY documents (source, chunk_id, content, embedding) FROM STDIN WITH (FORMAT BINARY)") as cp:
+                cp.set_types(["text", "int4", "text", _VECTOR_TYPE])
+                for offset, (chunk, vec) in enumerate(zip(chunks, embeddings)):
+                    cp.write_row((source, start + offset, chunk, _pg_vec(vec)))
+    _invalidate_stats_cache()
 
 def query_topk(qvec: List[float], k: int) -> List[Dict[str, Any]]:
-    with psycopg.connect(_dsn()) as conn:
-        with conn.cursor(row_factory=dict_row) as cur:
+    qarr = _pg_vec(qvec)
+    with _get_pool().connection() as conn:
+        # Explizite Transaktion, damit SET LOCAL trotz autocommit greift
+        with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
             # Set HNSW search quality parameter for fair comparison with ChromaDB
             cur.execute(f"SET LOCAL hnsw.ef_search = {PG_HNSW_EF_SEARCH};")
+            # Nativer Cosine-Operator <=> statt L2 + Python-Nachrechnung:
+            # der Score kommt direkt aus pgvector, kein d*d/2-Approximieren.
+            # ORDER BY über den Spalten-Alias: der Vektor wird nur einmal
+            # gebunden, der Planner sieht denselben Ausdruck für den Index
             cur.execute(
-                f"""
+                """
                 SELECT id, source, chunk_id, content,
-                       (embedding <-> %s::vector({EMBED_DIM})) AS l2_dist
+                       (embedding <=> %s) AS cos_dist
                 FROM documents
-                ORDER BY embedding <-> %s::vector({EMBED_DIM})
+                ORDER BY cos_dist
                 LIMIT %s;
                 """,
-                (vector_literal(qvec), vector_literal(qvec), k)
+                (qarr, k)
             )
             rows = cur.fetchall()
     hits = []
     for r in rows:
-        d = float(r["l2_dist"])
-        sim = 1.0 - (d*d)/2.0  # cosine ~ via normalized L2
+        sim = 1.0 - float(r["cos_dist"])
         hits.append({
             "id": int(r["id"]),
             "source": r["source"],
@@ -74,9 +160,20 @@ def query_topk(qvec: List[float], k: int) -> List[Dict[str, Any]]:
         })
     return hits
 
+# COUNT(*) + pg_total_relation_size sind volle Scans bzw. Katalog-Stats;
+# kurzer TTL-Cache wie auf der Chroma-Seite, invalidiert bei Writes
+_STATS_CACHE_TTL = 5.0
+_stats_cache = {"value": None, "ts": 0.0}
+
+def _invalidate_stats_cache():
+    _stats_cache["value"] = None
+
 def get_stats() -> Dict[str, Any]:
     """Gibt Statistiken über die PostgreSQL-Datenbank zurück"""
-    with psycopg.connect(_dsn()) as conn:
+    now = time.monotonic()
+    if _stats_cache["value"] is not None and now - _stats_cache["ts"] <= _STATS_CACHE_TTL:
+        return _stats_cache["value"]
+    with _get_pool().connection() as conn:
         with conn.cursor(row_factory=dict_row) as cur:
             # Anzahl Dokumente
             cur.execute("SELECT COUNT(*) as count FROM documents;")
@@ -87,14 +184,18 @@ def get_stats() -> Dict[str, Any]:
             size_bytes = cur.fetchone()["size"]
             size_mb = size_bytes / (1024 * 1024) if size_bytes else 0
 
-    return {
+    stats = {
         "document_count": count,
         "size_mb": round(size_mb, 2)
     }
+    _stats_cache["value"] = stats
+    _stats_cache["ts"] = now
+    return stats
 
 def reset_database():
     """Löscht alle Dokumente aus der Datenbank"""
-    with psycopg.connect(_dsn(), autocommit=True) as conn:
+    with _get_pool().connection() as conn:
         with conn.cursor() as cur:
             cur.execute("TRUNCATE TABLE documents;")
             # Index wird automatisch beibehalten
+    _invalidate_stats_cache()
@@ -1,74 +1,175 @@
 import httpx
 import asyncio
-from typing import List
+import hashlib
+import orjson
+import os
+import numpy as np
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional, Tuple
 from config import OLLAMA_URL, EMBEDDING_MODEL, EMBED_DIM
-from utils import l2_normalize
 from log import logger
+from utils import normalize_batch
 
 # Batch-Größe für Embeddings (Balance zwischen Durchsatz und Memory)
 BATCH_SIZE = 32
 
-async def ollama_embed(texts: List[str], max_retries: int = 5) -> List[List[float]]:
+# Anzahl gleichzeitig laufender Batch-Requests an Ollama: überlappt
+# Server-Compute mit Client-IO, ohne Ollama zu überladen
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+
+# LRU-Cache für Einzeltext-Embeddings: Query-Traffic wiederholt sich stark,
+# ein Treffer ersetzt HTTP-Roundtrip + Modell-Inferenz durch einen Dict-Lookup
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "4096"))
+_embed_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+# Geteilter Client mit Keep-Alive und HTTP/2 (sofern Ollama es aushandelt):
+# spart TCP-Connect + Header-Overhead pro Batch und multiplext parallele
+# Batches über eine Verbindung
+OLLAMA_HTTP2 = os.getenv("OLLAMA_HTTP2", "1") == "1"
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=OLLAMA_URL,
+            http2=OLLAMA_HTTP2,
+            timeout=180,
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+        )
+    return _client
+
+
+async def close_client():
+    """Schließt den geteilten Ollama-Client (Lifespan-Shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _embed_batch(client: httpx.AsyncClient, batch: List[str], max_retries: int) -> np.ndarray:
+    """Embeddet einen einzelnen Batch inkl. Retry/Backoff bei ladendem Modell"""
+    retries = 0
+    while True:
+        try:
+            url = "/api/embed"
+            payload = {
+                "model": EMBEDDING_MODEL,
+                "input": batch,  # Ollama unterstützt Liste von Strings
+                "keep_alive": "10m",
+                "options": {
+                    "num_ctx": 512  # Erhöht von default 256 auf 512 für längere Texte
+                }
+            }
+
+            # orjson statt stdlib-json-Encoder: Payload-Aufbau läuft in C,
+            # OPT_SERIALIZE_NUMPY erlaubt ndarrays direkt im Payload
+            r = await client.post(
+                url,
+                content=orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+                headers={"Content-Type": "application/json"},
+            )
+
+            if r.status_code != 200:
+                logger.error(f"Response body: {r.text[:500]}")
+
+            r.raise_for_status()
+            # orjson.loads statt r.json(): das Parsen der ~100 KB Float-Antwort
+            # ist nach dem Embedding selbst der größte CPU-Posten pro Batch
+            data = orjson.loads(r.content)
+
+            # Validiere Anzahl und Dimensionen in einem Shape-Check
+            arr = np.asarray(data.get("embeddings", []), dtype=np.float32)
+            if arr.shape != (len(batch), EMBED_DIM):
+                raise RuntimeError(f"Expected shape ({len(batch)}, {EMBED_DIM}), got {arr.shape}")
+
+            # L2-Normalisierung über den ganzen Batch statt pro Vektor;
+            # ndarray bleibt ndarray: kein .tolist()-Roundtrip in Boxed-Floats,
+            # die DB-Adapter (pgvector binary, Chroma) nehmen Arrays direkt
+            return normalize_batch(arr)
+
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404 and retries < max_retries - 1:
+                # Model is loading, wait and retry
+                wait_time = 3 ** retries  # Exponential backoff: 1s, 3s, 9s, 27s, 81s
+                logger.warning(f"Model not ready (404), retrying in {wait_time}s... ({retries + 1}/{max_retries})")
+                logger.warning(f"404 Response: {e.response.text[:200]}")
+                await asyncio.sleep(wait_time)
+                retries += 1
+            else:
+                logger.error(f"HTTP error {e.response.status_code}: {e.response.text[:500]}")
+                raise
+        except Exception as e:
+            logger.error(f"Unexpected error during batch embedding: {type(e).__name__}: {str(e)}")
+            raise
+
+
+async def ollama_embed(texts: List[str], max_retries: int = 5) -> np.ndarray:
     """
     Erstellt Embeddings für eine Liste von Texten in Batches.
-    Sendet mehrere Texte pro Request für bessere Performance.
+    Batches laufen parallel (begrenzt durch EMBED_CONCURRENCY), die
+    Reihenfolge der Ergebnisse entspricht der Eingabe.
+    Rückgabe ist ein zusammenhängendes float32-Array (N, EMBED_DIM).
     """
     if not texts:
-        return []
-
-    all_embeddings = []
-
-    async with httpx.AsyncClient(timeout=180) as client:
-        # Verarbeite Texte in Batches
-        for batch_start in range(0, len(texts), BATCH_SIZE):
-            batch_end = min(batch_start + BATCH_SIZE, len(texts))
-            batch = texts[batch_start:batch_end]
-
-            retries = 0
-            while retries < max_retries:
-                try:
-                    url = f"{OLLAMA_URL}/api/embed"
-                    payload = {
-                        "model": EMBEDDING_MODEL,
-                        "input": batch,  # Ollama unterstützt Liste von Strings
-                        "keep_alive": "10m",
-                        "options": {
-                            "num_ctx": 512  # Erhöht von default 256 auf 512 für längere Texte
-                        }
-                    }
-
-                    r = await client.post(url, json=payload)
-
-                    if r.status_code != 200:
-                        logger.error(f"Response body: {r.text[:500]}")
-
-                    r.raise_for_status()
-                    embeddings = r.json().get("embeddings", [])
-
-                    # Validiere Anzahl und Dimensionen
-                    if len(embeddings) != len(batch):
-                        raise RuntimeError(f"Expected {len(batch)} embeddings, got {len(embeddings)}")
-
-                    for vec in embeddings:
-                        if not vec or len(vec) != EMBED_DIM:
-                            raise RuntimeError(f"Unexpected embedding dim {len(vec) if vec else 0}, expected {EMBED_DIM}")
-                        all_embeddings.append(l2_normalize(vec))
-
-                    break  # Success, exit retry loop
-
-                except httpx.HTTPStatusError as e:
-                    if e.response.status_code == 404 and retries < max_retries - 1:
-                        # Model is loading, wait and retry
-                        wait_time = 3 ** retries  # Exponential backoff: 1s, 3s, 9s, 27s, 81s
-                        logger.warning(f"Model not ready (404), retrying in {wait_time}s... ({retries + 1}/{max_retries})")
-                        logger.warning(f"404 Response: {e.response.text[:200]}")
-                        await asyncio.sleep(wait_time)
-                        retries += 1
-                    else:
-                        logger.error(f"HTTP error {e.response.status_code}: {e.response.text[:500]}")
-                        raise
-                except Exception as e:
-                    logger.error(f"Unexpected error during batch embedding: {type(e).__name__}: {str(e)}")
-                    raise
-
-    return all_embeddings
+        return np.empty((0, EMBED_DIM), dtype=np.float32)
+
+    batches = [texts[i:i + BATCH_SIZE] for i in range(0, len(texts), BATCH_SIZE)]
+    sem = asyncio.Semaphore(EMBED_CONCURRENCY)
+    client = _get_client()
+
+    async def run_one(batch: List[str]) -> List[List[float]]:
+        async with sem:
+            return await _embed_batch(client, batch, max_retries)
+
+    # gather erhält die Batch-Reihenfolge, daher bleibt das Stapeln stabil
+    results = await asyncio.gather(*(run_one(b) for b in batches))
+
+    return np.vstack(results)
+
+
+async def ollama_embed_stream(texts: List[str], max_retries: int = 5) -> AsyncIterator[Tuple[int, np.ndarray]]:
+    """
+    Wie ollama_embed, aber als Stream: liefert (batch_start, embeddings)
+    sobald der jeweilige Batch fertig ist, nicht erst wenn alle durch sind.
+    Damit können DB-Writes bereits laufen, während Ollama noch embeddet.
+    """
+    if not texts:
+        return
+
+    batches = [(i, texts[i:i + BATCH_SIZE]) for i in range(0, len(texts), BATCH_SIZE)]
+    sem = asyncio.Semaphore(EMBED_CONCURRENCY)
+    client = _get_client()
+
+    async def run_one(start: int, batch: List[str]):
+        async with sem:
+            return start, await _embed_batch(client, batch, max_retries)
+
+    tasks = [asyncio.create_task(run_one(s, b)) for s, b in batches]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+async def embed_cached(text: str) -> np.ndarray:
+    """
+    Erstellt das Embedding für einen Einzeltext mit LRU-Cache.
+    Gecacht wird über einen blake2b-Hash, damit nicht die (potenziell langen)
+    Query-Strings selbst als Keys im Speicher liegen.
+    """
+    key = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+    vec = _embed_cache.get(key)
+    if vec is not None:
+        _embed_cache.move_to_end(key)
+        return vec
+
+    vec = (await ollama_embed([text]))[0]
+    _embed_cache[key] = vec
+    if len(_embed_cache) > EMBED_CACHE_SIZE:
+        _embed_cache.popitem(last=False)
+    return vec
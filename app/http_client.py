@@ -0,0 +1,32 @@
+# http_client.py
+# Geteilter httpx.AsyncClient für alle ausgehenden HTTP-Aufrufe (Waiter,
+# Spec-Downloads). Ein Client = ein Connection-Pool mit Keep-Alive statt
+# TCP/TLS-Handshake pro Aufruf; Ollama hat seinen eigenen Client in
+# embeddings.py, weil der andere Timeouts braucht.
+from typing import Optional
+import httpx
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(120, connect=10),
+            limits=httpx.Limits(
+                max_keepalive_connections=40,
+                max_connections=100,
+                keepalive_expiry=30,
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    """Schließt den geteilten Client (Lifespan-Shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 from log import logger
 from config import (
@@ -24,18 +25,25 @@ async def lifespan(app: FastAPI):
     init_chroma()
 
     # Warmup: Load embedding model
-    from embeddings import ollama_embed
+    from embeddings import embed_cached
     try:
-        await ollama_embed(["warmup"])
+        await embed_cached("warmup")
         logger.info("✅  Embedding model warmed up")
     except Exception as e:
         logger.warning(f"⚠️  Embedding warmup failed: {e}")
 
     logger.info("🚀  Dependencies ready; schema & collection initialized.")
     yield
+    # Geteilte HTTP-Clients sauber schließen
+    from embeddings import close_client
+    from http_client import close_client as close_http_client
+    await close_client()
+    await close_http_client()
     logger.info("👋  API shutting down.")
 
-app = FastAPI(title="WAB Benchmark API", lifespan=lifespan)
+# ORJSONResponse als Default: /query-Antworten mit vielen Floats werden
+# in C serialisiert statt über den stdlib-Encoder
+app = FastAPI(title="WAB Benchmark API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS für Frontend (Angular)
 app.add_middleware(
@@ -1,19 +1,59 @@
 from fastapi import APIRouter, HTTPException
-import httpx
+import asyncio
 import json
+import numpy as np
+import os
 from pathlib import Path
 from typing import List, Dict, Any
-from schemas import IngestRequest, QueryRequest
-from config import CHUNK_SIZE, CHUNK_OVERLAP
+from schemas import IngestRequest, IngestBatchRequest, QueryRequest
+from config import CHUNK_SIZE, CHUNK_OVERLAP, EMBED_DIM
 from utils import extract_text_from_openapi, chunk_text, now_ms
-from embeddings import ollama_embed
-from db_pg import replace_source as pg_replace, query_topk as pg_query, get_stats as pg_get_stats, reset_database as pg_reset
-from chroma_client import upsert_source as chroma_upsert, query as chroma_query, get_stats as chroma_get_stats, reset_collection as chroma_reset, get_filesystem_size as chroma_get_fs_size
+from embeddings import ollama_embed, ollama_embed_stream, embed_cached
+from http_client import get_client as get_http_client
+from db_pg import delete_source as pg_delete, append_chunks as pg_append, drop_embedding_index as pg_drop_index, create_embedding_index as pg_create_index, query_topk as pg_query, get_stats as pg_get_stats, reset_database as pg_reset
+from chroma_client import upsert_batch as chroma_upsert_batch, query as chroma_query, get_stats as chroma_get_stats, reset_collection as chroma_reset, get_filesystem_size as chroma_get_fs_size
 from log import logger
 
 
 router = APIRouter()
 
+# Semantischer Query-Cache: liegt eine neue Query im Embedding-Raum nah genug
+# an einer kürzlich beantworteten (Cosine auf normalisierten Vektoren), werden
+# deren Treffer direkt zurückgegeben — spart DB-Suche in beiden Backends.
+# Ringpuffer mit vorallokierter Matrix, ein Matmul pro Lookup.
+# Ab dieser Chunk-Anzahl wird der pgvector-HNSW-Index vor dem Ingest
+# gedroppt und danach einmal neu gebaut: Build-Kosten amortisieren über
+# den Batch statt pro Zeile einen Graph-Update zu zahlen
+PG_BULK_INDEX_THRESHOLD = int(os.getenv("PG_BULK_INDEX_THRESHOLD", "5000"))
+
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97"))
+_sem_matrix = np.empty((SEMANTIC_CACHE_SIZE, EMBED_DIM), dtype=np.float32)
+_sem_entries: List[Any] = [None] * SEMANTIC_CACHE_SIZE  # (k, result)
+_sem_count = 0
+_sem_next = 0
+
+def _semantic_lookup(qvec: np.ndarray, k: int):
+    if _sem_count == 0:
+        return None
+    scores = _sem_matrix[:_sem_count] @ qvec
+    i = int(np.argmax(scores))
+    if float(scores[i]) >= SEMANTIC_CACHE_THRESHOLD and _sem_entries[i][0] == k:
+        return _sem_entries[i][1]
+    return None
+
+def _semantic_store(qvec: np.ndarray, k: int, result: dict):
+    global _sem_count, _sem_next
+    _sem_matrix[_sem_next] = qvec
+    _sem_entries[_sem_next] = (k, result)
+    _sem_next = (_sem_next + 1) % SEMANTIC_CACHE_SIZE
+    _sem_count = min(_sem_count + 1, SEMANTIC_CACHE_SIZE)
+
+def _semantic_clear():
+    global _sem_count, _sem_next
+    _sem_count = 0
+    _sem_next = 0
+
 @router.get("/health")
 async def health():
     return {"status": "ok"}
@@ -21,72 +61,168 @@ async def health():
 @router.post("/embed")
 async def embed(text: str):
     t0 = now_ms()
-    vec = (await ollama_embed([text]))[0]
+    vec = await embed_cached(text)
     return {"dim": len(vec), "latency_ms": now_ms() - t0}
 
 async def _http_get_text(url: str) -> str:
-    async with httpx.AsyncClient(timeout=60) as client:
-        r = await client.get(url)
-        r.raise_for_status()
-        return r.text
+    r = await get_http_client().get(url, timeout=60)
+    r.raise_for_status()
+    return r.text
 
-@router.post("/ingest")
-async def ingest(req: IngestRequest):
-    if not req.text and not req.url:
-        raise HTTPException(400, "Provide either 'text' or 'url'.")
-    raw = req.text if req.text is not None else await _http_get_text(req.url)
+async def _ingest_source(source: str, raw: str, backend: str,
+                         chunk_size: int, chunk_overlap: int) -> dict:
+    """Gemeinsame Ingest-Pipeline für /ingest und /ingest_batch"""
     extracted = extract_text_from_openapi(raw)
-    chunks = chunk_text(extracted, req.chunk_size or CHUNK_SIZE, req.chunk_overlap or CHUNK_OVERLAP)
+    chunks = chunk_text(extracted, chunk_size or CHUNK_SIZE, chunk_overlap or CHUNK_OVERLAP)
     if not chunks:
         raise HTTPException(400, "No text to ingest after parsing/chunking.")
 
-    logger.info(f"Embedding {len(chunks)} chunks for '{req.source}'...")
-    t0 = now_ms()
-    embeds = await ollama_embed(chunks)
-    t_embed = now_ms() - t0
+    use_pg = backend in ("pg", "both")
+    use_chroma = backend in ("chroma", "both")
 
-    out = {"source": req.source, "num_chunks": len(chunks), "embed_ms": t_embed}
+    logger.info(f"Embedding {len(chunks)} chunks for '{source}'...")
 
-    if req.backend in ("pg", "both"):
-        t_pg = now_ms()
-        pg_replace(req.source, chunks, embeds)
-        out["pg_write_ms"] = now_ms() - t_pg
+    # Gestreamte Pipeline: DB-Writes starten pro Batch, sobald dessen
+    # Embeddings da sind, statt erst nach dem letzten Batch. Embedding
+    # (Ollama) und Writes (pg/chroma) überlappen dadurch.
+    bulk_pg = use_pg and len(chunks) >= PG_BULK_INDEX_THRESHOLD
+    if use_pg:
+        await asyncio.to_thread(pg_delete, source)
+    if bulk_pg:
+        logger.info(f"Bulk ingest ({len(chunks)} chunks): dropping HNSW index for the load")
+        await asyncio.to_thread(pg_drop_index)
 
-    if req.backend in ("chroma", "both"):
-        t_c = now_ms()
-        chroma_upsert(req.source, chunks, embeds)
-        out["chroma_write_ms"] = now_ms() - t_c
+    pg_ms = [0.0]
+    chroma_ms = [0.0]
+    tasks = []
+
+    async def _pg_write(start, batch_chunks, batch_embeds):
+        t = now_ms()
+        await asyncio.to_thread(pg_append, source, start, batch_chunks, batch_embeds)
+        pg_ms[0] += now_ms() - t
+
+    async def _chroma_write(start, batch_chunks, batch_embeds):
+        t = now_ms()
+        await asyncio.to_thread(chroma_upsert_batch, source, start, batch_chunks, batch_embeds)
+        chroma_ms[0] += now_ms() - t
+
+    t0 = now_ms()
+    try:
+        async for start, batch_embeds in ollama_embed_stream(chunks):
+            batch_chunks = chunks[start:start + len(batch_embeds)]
+            if use_pg:
+                tasks.append(asyncio.create_task(_pg_write(start, batch_chunks, batch_embeds)))
+            if use_chroma:
+                tasks.append(asyncio.create_task(_chroma_write(start, batch_chunks, batch_embeds)))
+        t_embed = now_ms() - t0
+
+        if tasks:
+            await asyncio.gather(*tasks)
+    except BaseException:
+        # Bereits gestartete Write-Tasks nicht verwaist im Hintergrund
+        # weiterlaufen lassen: abbrechen und einsammeln, sonst bleiben
+        # ihre Exceptions unabgeholt
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        if bulk_pg:
+            # Index auch im Fehlerfall neu aufbauen: ohne ihn liefe jede
+            # pgvector-Query bis zum nächsten Bulk-Ingest als Sequential
+            # Scan und würde alle nachfolgenden Messungen verfälschen.
+            # Im Erfolgsfall zählt der einmalige Neuaufbau zur pg-Schreibzeit
+            t = now_ms()
+            await asyncio.to_thread(pg_create_index)
+            pg_ms[0] += now_ms() - t
+
+    out = {"source": source, "num_chunks": len(chunks), "embed_ms": t_embed}
+    if use_pg:
+        # Summierte Write-Zeit; läuft größtenteils parallel zum Embedding
+        out["pg_write_ms"] = pg_ms[0]
+    if use_chroma:
+        out["chroma_write_ms"] = chroma_ms[0]
 
     return out
 
+@router.post("/ingest")
+async def ingest(req: IngestRequest):
+    if not req.text and not req.url:
+        raise HTTPException(400, "Provide either 'text' or 'url'.")
+    raw = req.text if req.text is not None else await _http_get_text(req.url)
+    out = await _ingest_source(req.source, raw, req.backend, req.chunk_size, req.chunk_overlap)
+    # Datenbestand hat sich geändert — gecachte Trefferlisten sind ungültig
+    _semantic_clear()
+    return out
+
+@router.post("/ingest_batch")
+async def ingest_batch(req: IngestBatchRequest):
+    """
+    Ingestet mehrere Specs in einem HTTP-Roundtrip. Amortisiert
+    Request-Overhead und warmes Embedding-Modell über alle Items;
+    gibt pro Item dieselben Timings zurück wie /ingest.
+    """
+    if not req.items:
+        raise HTTPException(400, "Provide at least one item.")
+
+    per_item_timings = []
+    for item in req.items:
+        if not item.text and not item.url:
+            raise HTTPException(400, f"Item '{item.source}': provide either 'text' or 'url'.")
+        raw = item.text if item.text is not None else await _http_get_text(item.url)
+        out = await _ingest_source(item.source, raw, req.backend, req.chunk_size, req.chunk_overlap)
+        per_item_timings.append(out)
+
+    _semantic_clear()
+    return {"num_items": len(per_item_timings), "per_item_timings": per_item_timings}
+
 @router.post("/query")
 async def query(req: QueryRequest):
     logger.info(f"Embedding query text (length={len(req.text)})...")
     t0 = now_ms()
-    qvec = (await ollama_embed([req.text]))[0]
+    if req.use_cache:
+        qvec = await embed_cached(req.text)
+    else:
+        # Cache-Bypass (Benchmark): embed_ms soll echte Ollama-Latenz
+        # messen, kein Dict-Lookup aus dem Embed-LRU
+        qvec = (await ollama_embed([req.text]))[0]
     t_embed = now_ms() - t0
 
-    pg_ms0 = now_ms()
-    pg_hits = pg_query(qvec, req.k)
-    pg_ms = now_ms() - pg_ms0
-
-    c_ms0 = now_ms()
-    res = chroma_query(qvec, k=req.k)
-    c_ms = now_ms() - c_ms0
+    if req.use_cache:
+        cached = _semantic_lookup(qvec, req.k)
+        if cached is not None:
+            return {**cached, "embed_ms": t_embed, "cached": True}
+
+    # Beide Lookups sind unabhängige Netzwerk-Roundtrips — parallel in
+    # Worker-Threads statt nacheinander: Wandzeit = max(pg, chroma)
+    async def _timed(fn, *args, **kwargs):
+        t = now_ms()
+        result = await asyncio.to_thread(fn, *args, **kwargs)
+        return result, now_ms() - t
+
+    (pg_hits, pg_ms), (res, c_ms) = await asyncio.gather(
+        _timed(pg_query, qvec, req.k),
+        _timed(chroma_query, qvec, k=req.k),
+    )
     docs = res.get("documents", [[]])[0]
     metas = res.get("metadatas", [[]])[0]
     dists = res.get("distances", [[]])[0]
+    # Scores vektorisiert in einem NumPy-Pass statt 1.0 - dist pro
+    # Treffer — bei k=5 egal, bei k=100+ oder späterem Re-Ranking nicht
+    scores = (1.0 - np.asarray(dists, dtype=np.float32)).tolist()
+    # Vorab gebundenes dict.get statt Methoden-Lookup pro Treffer
+    _get = dict.get
     chroma_hits = [
         {
-            "source": m.get("source"),
-            "chunk_id": m.get("chunk"),
+            "source": _get(m, "source"),
+            "chunk_id": _get(m, "chunk"),
             "content": (d or "")[:400],
-            "score": 1.0 - float(dist),
+            "score": score,
         }
-        for d, m, dist in zip(docs, metas, dists)
+        for d, m, score in zip(docs, metas, scores)
     ]
 
-    return {
+    result = {
         "k": req.k,
         "embed_ms": t_embed,
         "pg_ms": pg_ms,
@@ -94,6 +230,9 @@ async def query(req: QueryRequest):
         "chroma_ms": c_ms,
         "chroma_results": chroma_hits
     }
+    if req.use_cache:
+        _semantic_store(qvec, req.k, result)
+    return result
 
 @router.get("/stats")
 async def stats():
@@ -125,66 +264,75 @@ async def analyze_specs():
     except Exception as e:
         raise HTTPException(500, f"Failed to load api_specs_list.json: {str(e)}")
 
-    results = []
-
-    async with httpx.AsyncClient(timeout=120) as client:
-        for category_name, category_data in specs_data['categories'].items():
-            for spec in category_data['specs']:
-                api_name = spec['name']
-                api_url = spec['url']
-                estimated_loc = spec.get('estimated_loc', 0)
-
-                logger.info(f"Analyzing {api_name}...")
-
-                try:
-                    # Download spec
-                    response = await client.get(api_url)
-                    raw_text = response.text
-
-                    # Extract text
-                    extracted_text = extract_text_from_openapi(raw_text)
-
-                    # Generate chunks
-                    chunks = chunk_text(extracted_text, CHUNK_SIZE, CHUNK_OVERLAP)
-
-                    # Calculate metrics
-                    raw_chars = len(raw_text)
-                    extracted_chars = len(extracted_text)
-                    extraction_ratio = (extracted_chars / raw_chars * 100) if raw_chars > 0 else 0
-                    num_chunks = len(chunks)
-
-                    results.append({
-                        "api": api_name,
-                        "category": category_name,
-                        "loc": estimated_loc,
-                        "raw_chars": raw_chars,
-                        "extracted_chars": extracted_chars,
-                        "extraction_ratio": round(extraction_ratio, 1),
-                        "num_chunks": num_chunks
-                    })
-
-                    logger.info(f"  ✓ {api_name}: {num_chunks} chunks ({extraction_ratio:.1f}% extraction)")
-
-                except Exception as e:
-                    logger.error(f"  ✗ Failed to analyze {api_name}: {str(e)}")
-                    results.append({
-                        "api": api_name,
-                        "category": category_name,
-                        "loc": estimated_loc,
-                        "raw_chars": 0,
-                        "extracted_chars": 0,
-                        "extraction_ratio": 0,
-                        "num_chunks": 0,
-                        "error": str(e)
-                    })
-
-    return {"specs": results}
+    client = get_http_client()
+    # Downloads laufen parallel (Semaphore begrenzt auf 16 gleichzeitige
+    # Requests), Parsen/Chunken wandert in Worker-Threads, damit große
+    # Specs den Event-Loop nicht blockieren
+    sem = asyncio.Semaphore(16)
+
+    def _analyze_text(raw_text: str):
+        extracted_text = extract_text_from_openapi(raw_text)
+        chunks = chunk_text(extracted_text, CHUNK_SIZE, CHUNK_OVERLAP)
+        return len(extracted_text), len(chunks)
+
+    async def analyze_one(category_name: str, spec: dict) -> dict:
+        api_name = spec['name']
+        api_url = spec['url']
+        estimated_loc = spec.get('estimated_loc', 0)
+
+        logger.info(f"Analyzing {api_name}...")
+
+        try:
+            async with sem:
+                response = await client.get(api_url)
+            raw_text = response.text
+
+            extracted_chars, num_chunks = await asyncio.to_thread(_analyze_text, raw_text)
+
+            raw_chars = len(raw_text)
+            extraction_ratio = (extracted_chars / raw_chars * 100) if raw_chars > 0 else 0
+
+            logger.info(f"  ✓ {api_name}: {num_chunks} chunks ({extraction_ratio:.1f}% extraction)")
+
+            return {
+                "api": api_name,
+                "category": category_name,
+                "loc": estimated_loc,
+                "raw_chars": raw_chars,
+                "extracted_chars": extracted_chars,
+                "extraction_ratio": round(extraction_ratio, 1),
+                "num_chunks": num_chunks
+            }
+
+        except Exception as e:
+            logger.error(f"  ✗ Failed to analyze {api_name}: {str(e)}")
+            return {
+                "api": api_name,
+                "category": category_name,
+                "loc": estimated_loc,
+                "raw_chars": 0,
+                "extracted_chars": 0,
+                "extraction_ratio": 0,
+                "num_chunks": 0,
+                "error": str(e)
+            }
+
+    tasks = [
+        analyze_one(category_name, spec)
+        for category_name, category_data in specs_data['categories'].items()
+        for spec in category_data['specs']
+    ]
+    # gather erhält die Listen-Reihenfolge — Ausgabe bleibt wie bisher
+    results = await asyncio.gather(*tasks)
+
+    return {"specs": list(results)}
 
 @router.post("/reset")
 async def reset():
     """Setzt beide Datenbanken zurück (löscht alle Daten)"""
     pg_reset()
     chroma_reset()
+    _semantic_clear()
 
     return {
         "status": "success",
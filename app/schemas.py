@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class IngestRequest(BaseModel):
     source: str = Field(..., description="z.B. URL oder Dateiname")
@@ -9,6 +9,20 @@ class IngestRequest(BaseModel):
     chunk_size: Optional[int] = None
     chunk_overlap: Optional[int] = None
 
+class IngestBatchItem(BaseModel):
+    source: str = Field(..., description="z.B. URL oder Dateiname")
+    text: Optional[str] = None
+    url: Optional[str] = None
+
+class IngestBatchRequest(BaseModel):
+    items: List[IngestBatchItem]
+    backend: str = Field("both", pattern="^(pg|chroma|both)$")
+    chunk_size: Optional[int] = None
+    chunk_overlap: Optional[int] = None
+
 class QueryRequest(BaseModel):
     text: str
     k: int = 5
+    # False = Embed-LRU und semantischen Cache umgehen; für Benchmarks,
+    # die echte DB-Latenzen messen wollen statt Cache-Treffer
+    use_cache: bool = True
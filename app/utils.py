@@ -1,15 +1,43 @@
+import hashlib
+import io
 import math, time, yaml
+import numpy as np
+from collections import OrderedDict
 from typing import List
 
+# libyaml-backed Loader (C-Extension) ist auf großen Specs eine
+# Größenordnung schneller; Fallback auf den Pure-Python-SafeLoader,
+# falls PyYAML ohne libyaml gebaut wurde
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 def now_ms() -> float:
-    return time.perf_counter() * 1000.0
+    # Integer-Tick aus perf_counter_ns, Umrechnung in ms erst hier am Rand
+    return time.perf_counter_ns() / 1_000_000.0
 
-def l2_normalize(vec: List[float]) -> List[float]:
-    s = math.sqrt(sum(v*v for v in vec)) or 1.0
-    return [v / s for v in vec]
+def l2_normalize(vec) -> np.ndarray:
+    """
+    L2-normalisiert einen einzelnen Vektor. Läuft komplett in NumPy
+    (eine SIMD-Reduktion + ein Broadcast) statt als Python-Schleife
+    über jede Komponente.
+    """
+    arr = np.asarray(vec, dtype=np.float32)
+    s = float(np.dot(arr, arr))
+    if s <= 0.0:
+        return arr
+    return arr * (1.0 / math.sqrt(s))
 
-def vector_literal(vec: List[float]) -> str:
-    return "[" + ",".join(f"{v:.7f}" for v in vec) + "]"
+def normalize_batch(arr: np.ndarray) -> np.ndarray:
+    """
+    L2-normalisiert alle Zeilen eines (N, dim)-Arrays in-place-frei.
+    einsum + reziproke Wurzel statt Python-Schleife: eine SIMD-Reduktion
+    pro Zeile, ein Broadcast-Multiply fürs Skalieren.
+    """
+    norms = np.einsum("ij,ij->i", arr, arr)
+    inv = 1.0 / np.sqrt(np.maximum(norms, 1e-24))
+    return arr * inv[:, None]
 
 def read_secret(path: str) -> str:
     try:
@@ -19,20 +47,55 @@ def read_secret(path: str) -> str:
         return ""
 
 def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
-    t = (text or "").strip()
-    if not t:
+    t = text or ""
+    n = len(t)
+    # Whitespace-Ränder per Index bestimmen statt strip(): erspart die
+    # Kopie der kompletten (potenziell Multi-MB) Eingabe
+    a = 0
+    while a < n and t[a].isspace():
+        a += 1
+    b = n
+    while b > a and t[b - 1].isspace():
+        b -= 1
+    if a >= b:
         return []
-    chunks, n = [], len(t)
-    start = 0
-    while start < n:
-        end = min(n, start + chunk_size)
-        chunks.append(t[start:end])
-        if end == n:
+    # Erst alle (start, end)-Offsets berechnen, dann die Substrings einmal
+    # am Stück materialisieren
+    offsets = []
+    start = a
+    while start < b:
+        end = min(b, start + chunk_size)
+        offsets.append((start, end))
+        if end == b:
             break
-        start = max(0, end - overlap)
-    return chunks
+        # Fortschritt erzwingen, falls overlap >= chunk_size konfiguriert ist
+        start = end - overlap if end - overlap > start else end
+    return [t[s:e] for s, e in offsets]
+
+# /ingest und /analyze-specs verarbeiten häufig dieselben Specs mehrfach;
+# Extraktion (JSON/YAML-Parse + Traversal) ist der teure Teil und wird per
+# Content-Hash gecacht. Chunking danach ist billig und bleibt ungecacht.
+_EXTRACT_CACHE_MAX = 128
+_EXTRACT_CACHE_TTL = 300.0
+_extract_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
 
 def extract_text_from_openapi(raw: str) -> str:
+    key = hashlib.blake2b(raw.encode(), digest_size=16).digest()
+    now = time.monotonic()
+    hit = _extract_cache.get(key)
+    if hit is not None and now - hit[1] <= _EXTRACT_CACHE_TTL:
+        _extract_cache.move_to_end(key)
+        return hit[0]
+
+    extracted = _extract_text_uncached(raw)
+
+    _extract_cache[key] = (extracted, now)
+    if len(_extract_cache) > _EXTRACT_CACHE_MAX:
+        _extract_cache.popitem(last=False)
+    return extracted
+
+
+def _extract_text_uncached(raw: str) -> str:
     """
     Extrahiert strukturierten Text aus OpenAPI-Spezifikation für RAG.
     Unterstützt OpenAPI 2.x und 3.x (YAML/JSON).
@@ -44,122 +107,135 @@ def extract_text_from_openapi(raw: str) -> str:
     - Request/Response Bodies
     """
     try:
-        # Versuche zuerst als JSON zu parsen (schneller und robuster)
-        import json
+        # Versuche zuerst als JSON zu parsen (schneller und robuster);
+        # orjson parst Multi-MB-Specs deutlich schneller als stdlib-json
+        import orjson
         try:
-            data = json.loads(raw)
-        except (json.JSONDecodeError, ValueError):
-            # Falls JSON fehlschlägt, versuche YAML mit UnsafeLoader
-            # (UnsafeLoader kann mehr YAML-Features parsen, auch wenn sie nicht standard sind)
-            try:
-                data = yaml.load(raw, Loader=yaml.UnsafeLoader)
-            except Exception:
-                # Als letzter Versuch: FullLoader
-                data = yaml.load(raw, Loader=yaml.FullLoader)
-
-        parts = []
+            data = orjson.loads(raw)
+        except (orjson.JSONDecodeError, ValueError):
+            # Falls JSON fehlschlägt: YAML über den C-Loader
+            data = yaml.load(raw, Loader=_YamlLoader)
 
         if not isinstance(data, dict):
             return raw
 
+        # StringIO-Writer statt parts-Liste + join am Ende: Textteile
+        # landen direkt im wachsenden Puffer, ohne tausende kurzlebige
+        # Listeneinträge, die der GC gleich wieder einsammelt
+        buf = io.StringIO()
+        w = buf.write
+
+        def emit(s: str):
+            # leere/Whitespace-Teile überspringen (alter join-Filter)
+            if s and not s.isspace():
+                w(s)
+                w("\n")
+
         # 1. Info-Bereich
         info = data.get("info", {})
         if isinstance(info, dict):
-            parts += [str(info.get("title", "")), str(info.get("description", ""))]
+            emit(str(info.get("title", "")))
+            emit(str(info.get("description", "")))
 
         # 2. Paths mit Operations
         paths = data.get("paths", {})
         if isinstance(paths, dict):
             for path, ops in paths.items():
-                parts.append(f"Path: {path}")
-                if isinstance(ops, dict):
-                    for method, spec in ops.items():
-                        if not isinstance(spec, dict):
-                            continue
-                        parts.append(f"Method: {method}")
-
-                        # Operation summary, description, tags
-                        for k in ("summary", "description"):
-                            if k in spec and spec[k]:
-                                parts.append(str(spec[k]))
-                        tags = spec.get("tags")
-                        if isinstance(tags, list):
-                            parts += [str(t) for t in tags]
-
-                        # Parameters (OpenAPI 2.x und 3.x)
-                        params = spec.get("parameters", [])
-                        if isinstance(params, list):
-                            for param in params:
-                                if isinstance(param, dict):
-                                    p_name = param.get("name", "")
-                                    p_desc = param.get("description", "")
-                                    if p_name:
-                                        parts.append(f"Parameter: {p_name}")
-                                    if p_desc:
-                                        parts.append(str(p_desc))
-
-                        # Request Body (OpenAPI 3.x)
-                        req_body = spec.get("requestBody", {})
-                        if isinstance(req_body, dict):
-                            rb_desc = req_body.get("description", "")
-                            if rb_desc:
-                                parts.append(f"Request: {rb_desc}")
-
-                        # Responses
-                        responses = spec.get("responses", {})
-                        if isinstance(responses, dict):
-                            for status_code, resp in responses.items():
-                                if isinstance(resp, dict):
-                                    r_desc = resp.get("description", "")
-                                    if r_desc:
-                                        parts.append(f"Response {status_code}: {r_desc}")
+                emit(f"Path: {path}")
+                if not isinstance(ops, dict):
+                    continue
+                for method, spec in ops.items():
+                    if not isinstance(spec, dict):
+                        continue
+                    emit(f"Method: {method}")
+
+                    # Operation summary, description, tags
+                    val = spec.get("summary")
+                    if val:
+                        emit(str(val))
+                    val = spec.get("description")
+                    if val:
+                        emit(str(val))
+                    tags = spec.get("tags")
+                    if isinstance(tags, list):
+                        for t in tags:
+                            emit(str(t))
+
+                    # Parameters (OpenAPI 2.x und 3.x)
+                    params = spec.get("parameters")
+                    if isinstance(params, list):
+                        for param in params:
+                            if isinstance(param, dict):
+                                p_name = param.get("name")
+                                if p_name:
+                                    emit(f"Parameter: {p_name}")
+                                p_desc = param.get("description")
+                                if p_desc:
+                                    emit(str(p_desc))
+
+                    # Request Body (OpenAPI 3.x)
+                    req_body = spec.get("requestBody")
+                    if isinstance(req_body, dict):
+                        rb_desc = req_body.get("description")
+                        if rb_desc:
+                            emit(f"Request: {rb_desc}")
+
+                    # Responses
+                    responses = spec.get("responses")
+                    if isinstance(responses, dict):
+                        for status_code, resp in responses.items():
+                            if isinstance(resp, dict):
+                                r_desc = resp.get("description")
+                                if r_desc:
+                                    emit(f"Response {status_code}: {r_desc}")
 
         # 3. Schemas/Components (OpenAPI 3.x)
         components = data.get("components", {})
         if isinstance(components, dict):
             schemas = components.get("schemas", {})
-            _extract_schemas(schemas, parts)
+            _extract_schemas(schemas, emit)
 
         # 4. Definitions (OpenAPI 2.x)
         definitions = data.get("definitions", {})
         if isinstance(definitions, dict):
-            _extract_schemas(definitions, parts)
+            _extract_schemas(definitions, emit)
 
-        txt = "\n".join([x for x in parts if x and x.strip()])
-        return txt if txt.strip() else raw
+        txt = buf.getvalue()
+        # letztes Newline abschneiden; leerer Puffer -> Rohtext zurück
+        return txt[:-1] if txt else raw
     except Exception:
         return raw
 
 
-def _extract_schemas(schemas: dict, parts: List[str]) -> None:
+def _extract_schemas(schemas: dict, emit) -> None:
     """
     Hilfsfunktion: Extrahiert Text aus Schema-Definitionen.
-    Sammelt Namen, Descriptions und Property-Informationen.
+    Schreibt Namen, Descriptions und Property-Informationen über den
+    übergebenen emit-Writer.
     """
     if not isinstance(schemas, dict):
         return
-
     for schema_name, schema_def in schemas.items():
         if not isinstance(schema_def, dict):
             continue
 
-        parts.append(f"Schema: {schema_name}")
+        emit(f"Schema: {schema_name}")
 
         # Schema description
-        s_desc = schema_def.get("description", "")
+        s_desc = schema_def.get("description")
         if s_desc:
-            parts.append(str(s_desc))
+            emit(str(s_desc))
 
         # Properties
-        properties = schema_def.get("properties", {})
+        properties = schema_def.get("properties")
         if isinstance(properties, dict):
             for prop_name, prop_def in properties.items():
                 if isinstance(prop_def, dict):
-                    prop_desc = prop_def.get("description", "")
-                    prop_type = prop_def.get("type", "")
-                    prop_info = f"Property: {prop_name}"
+                    prop_type = prop_def.get("type")
                     if prop_type:
-                        prop_info += f" ({prop_type})"
-                    parts.append(prop_info)
+                        emit(f"Property: {prop_name} ({prop_type})")
+                    else:
+                        emit(f"Property: {prop_name}")
+                    prop_desc = prop_def.get("description")
                     if prop_desc:
-                        parts.append(str(prop_desc))
+                        emit(str(prop_desc))
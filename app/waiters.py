@@ -1,5 +1,6 @@
-import time, asyncio, httpx, psycopg
+import time, asyncio, psycopg
 from psycopg.rows import tuple_row
+from http_client import get_client
 from log import logger
 from utils import read_secret
 
@@ -9,21 +10,21 @@ async def wait_for_http_ok(name: str, url: str, max_seconds: int, interval: floa
     deadline = t0 + max_seconds
     last_err = None
     tries = 0
-    async with httpx.AsyncClient(timeout=10) as client:
-        while time.monotonic() < deadline:
-            tries += 1
-            try:
-                r = await client.get(url)
-                if r.status_code == expect_status:
-                    dt = (time.monotonic() - t0) * 1000
-                    logger.info("✅  [%s] bereit (HTTP %s) nach %.0f ms", name, r.status_code, dt)
-                    return
-                last_err = f"status={r.status_code} body={r.text[:160]}"
-            except Exception as e:
-                last_err = repr(e)
-            if tries % max(1, int(10/interval)) == 0:
-                logger.info("⏳  [%s] noch nicht bereit ... (tries=%d, last_err=%s)", name, tries, last_err)
-            await asyncio.sleep(interval)
+    client = get_client()
+    while time.monotonic() < deadline:
+        tries += 1
+        try:
+            r = await client.get(url, timeout=10)
+            if r.status_code == expect_status:
+                dt = (time.monotonic() - t0) * 1000
+                logger.info("✅  [%s] bereit (HTTP %s) nach %.0f ms", name, r.status_code, dt)
+                return
+            last_err = f"status={r.status_code} body={r.text[:160]}"
+        except Exception as e:
+            last_err = repr(e)
+        if tries % max(1, int(10/interval)) == 0:
+            logger.info("⏳  [%s] noch nicht bereit ... (tries=%d, last_err=%s)", name, tries, last_err)
+        await asyncio.sleep(interval)
     logger.error("❌  [%s] Timeout: %s", name, last_err)
     raise TimeoutError(f"Timeout waiting for {name} at {url} (last_err={last_err})")
 
@@ -39,10 +40,12 @@ async def wait_for_postgres(host: str, port: int, db: str, user: str, password_f
     while time.monotonic() < deadline:
         tries += 1
         try:
-            with psycopg.connect(dsn, connect_timeout=5) as conn:
-                with conn.cursor(row_factory=tuple_row) as cur:
-                    cur.execute("SELECT 1;")
-                    cur.fetchone()
+            # AsyncConnection statt synchronem connect: DNS/TCP/Auth blockieren
+            # den Event-Loop nicht, parallele HTTP-Waiter laufen weiter
+            async with await psycopg.AsyncConnection.connect(dsn, connect_timeout=5) as conn:
+                async with conn.cursor(row_factory=tuple_row) as cur:
+                    await cur.execute("SELECT 1;")
+                    await cur.fetchone()
                     dt = (time.monotonic() - t0) * 1000
                     logger.info("✅  [Postgres] bereit nach %.0f ms (tries=%d)", dt, tries)
                     return
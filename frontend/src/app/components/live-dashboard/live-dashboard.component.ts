@@ -492,7 +492,7 @@ export class LiveDashboardComponent implements OnInit, OnDestroy {
     // Bei Completion - hole Results via HTTP
     if (progress.status === 'completed' && progress.benchmark_id) {
       console.log('Benchmark completed, fetching results...');
-      this.benchmarkService.getBenchmarkStatus(progress.benchmark_id).subscribe({
+      this.benchmarkService.getBenchmarkStatus(progress.benchmark_id, true).subscribe({
         next: (status) => {
           if (status.results && status.results.length > 0) {
             this.results = status.results;
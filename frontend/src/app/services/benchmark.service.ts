@@ -124,9 +124,13 @@ export class BenchmarkService {
   /**
    * Holt Status eines laufenden Benchmarks via HTTP
    * Alternative zu SSE für einmalige Abfragen
+   *
+   * includeResults=true lädt zusätzlich die Result-Rows
+   * (Default des Endpoints sind nur Metadaten)
    */
-  getBenchmarkStatus(benchmarkId: string): Observable<any> {
-    return this.http.get(`${this.apiUrl}/benchmark/status/${benchmarkId}`);
+  getBenchmarkStatus(benchmarkId: string, includeResults: boolean = false): Observable<any> {
+    const suffix = includeResults ? '?results=true' : '';
+    return this.http.get(`${this.apiUrl}/benchmark/status/${benchmarkId}${suffix}`);
   }
 
   /**